@@ -11,8 +11,24 @@ import numpy as np
 from gnuradio import gr
 import requests
 import os
+import time
 import threading
-import queue
+
+from .buffers import ChunkPool, ChunkQueue
+from .webhdfs import make_session
+from .compression import check_compression, compress
+
+# Number of part files spliced per CONCAT request, keeping the request URL short
+_CONCAT_BATCH = 64
+
+# Map input types to numpy dtypes
+_INPUT_TYPES = {
+    "complex": np.complex64,
+    "float": np.float32,
+    "int": np.int32,
+    "short": np.int16,
+    "byte": np.int8
+}
 
 class HDFSSink(gr.sync_block):
     """
@@ -20,7 +36,9 @@ class HDFSSink(gr.sync_block):
     Mimics GNU Radio's File Sink block but targets HDFS instead of a local file system.
     """
 
-    def __init__(self, filename, folder, webhdfs_addr, user="hadoop", append="Append", input_type="complex", buffer_size=134217728):
+    def __init__(self, filename, folder, webhdfs_addr, user="hadoop", append="Append", input_type="complex", buffer_size=134217728,
+                 flush_interval_ms=0, min_flush_bytes=1048576, compression="none",
+                 num_writers=1):
         """
         Args:
             filename (str): Name of the file to save in HDFS.
@@ -30,19 +48,19 @@ class HDFSSink(gr.sync_block):
             append (str): Either "Append" or "Overwrite".
             input_type (str): Input data type (e.g., "complex").
             buffer_size (int): Size of the internal buffer in bytes (default is 128 MB).
+            flush_interval_ms (int): Also flush a partially filled buffer once this many milliseconds
+                have passed since the last flush (0 disables time-based flushing).
+            min_flush_bytes (int): Minimum number of buffered bytes for a time-based flush (default is 1 MB).
+            compression (str): "none", "zstd" or "gzip". Each chunk is stored as a level-1 compressed
+                frame, so the file must be read back with an HDFS Source using the same setting.
+            num_writers (int): Number of chunks uploaded in parallel (default is 1). Above 1, chunks are
+                written to separate part files next to the target and spliced onto it with CONCAT in stop().
         """
 
-        # Map input types to numpy dtypes
-        input_type_dict = {
-            "complex": np.complex64,
-            "float": np.float32,
-            "int": np.int32,
-            "short": np.int16,
-            "byte": np.int8
-        }
-
         # Define in_sig based on the selected input_type
-        in_sig = [input_type_dict[input_type]]
+        in_sig = [_INPUT_TYPES[input_type]]
+        self._dtype = in_sig[0]
+        self._itemsize = np.dtype(self._dtype).itemsize
 
         # Call the parent constructor with the determined input signal type and no output
         super(HDFSSink, self).__init__(
@@ -63,33 +81,67 @@ class HDFSSink(gr.sync_block):
         # Base URL for WebHDFS operations on this file (uses user.name for authentication)
         self.base_url = f"http://{self.webhdfs_addr}/webhdfs/v1{self.hdfs_file_path}?user.name={self.user}"
 
-        # Internal buffering setup: buffer_size is the threshold for flushing to HDFS
-        self.buffer_size = buffer_size
-        self.internal_buffer = bytearray()
-        self.queue = queue.Queue()
-        self.stop_event = threading.Event()
-        self.writer_thread = threading.Thread(target=self._writer)
-        self.lock = threading.Lock()
+        # Parallel writers: HDFS allows a single writer per file, so with num_writers > 1 each chunk
+        # goes to its own part file, tagged with its sequence number for the final CONCAT
+        self.num_writers = max(1, num_writers)
+        self._seq = 0              # Sequence number of the next flushed chunk
+        self._parts = set()        # Sequence numbers of part files written successfully
+        self._parts_lock = threading.Lock()
+
+        # Bounded hand-off to the writer threads: work() blocks (backpressure) once the writers fall
+        # num_writers + 1 chunks behind, so staging + queued + in-flight buffers all fit in the pool
+        self.queue = ChunkQueue(maxsize=self.num_writers + 1)
+        self.writer_threads = [threading.Thread(target=self._writer) for _ in range(self.num_writers)]
+
+        # Persistent HTTP session: keeps NameNode and DataNode connections alive between requests
+        self.session = make_session(pool_maxsize=max(4, self.num_writers))
+
+        # Internal buffering setup: buffer_size is the threshold for flushing to HDFS,
+        # rounded down to whole items so the buffer can be staged as a typed array
+        if buffer_size < self._itemsize:
+            raise ValueError(f"buffer_size must be at least one {input_type} item ({self._itemsize} bytes), got {buffer_size}")
+        self.buffer_size = buffer_size - buffer_size % self._itemsize
+        self.pool = ChunkPool(self.buffer_size, max_chunks=2 * self.num_writers + 2)
+        # internal_buffer is a memoryview over a pooled bytearray, so slicing it never copies;
+        # _stage is a numpy view of the same memory that work() fills item by item
+        self.internal_buffer = memoryview(self.pool.get())
+        self._stage = np.frombuffer(self.internal_buffer, dtype=self._dtype)
+        self._stage_n = 0  # Number of items currently staged
+        # internal_buffer is only touched by work() and stop(), which the scheduler never runs
+        # concurrently; in debug mode these flags verify that assumption instead of a lock
+        self._in_work = False
+        self._stopped = False
+
+        # Optional deadline-based flushing for low-rate streams
+        self.flush_interval_ns = int(flush_interval_ms * 1e6)
+        self.min_flush_bytes = min_flush_bytes
+        self._last_flush_ns = time.monotonic_ns()
+
+        check_compression(compression)
+        self.compression = compression
+
+        # DataNode URL from the last APPEND redirect, reused to skip the NameNode round-trip
+        self._append_dn_url = None
 
     def start(self):
         """Prepare for writing data to HDFS: check existence, delete or create file as needed."""
         print("Starting HDFSSink block...")
         try:
             # Check if the target file already exists in HDFS
-            response = requests.get(f"{self.base_url}&op=GETFILESTATUS", timeout=10)
+            response = self.session.get(f"{self.base_url}&op=GETFILESTATUS", timeout=10)
 
             if response.status_code == 200:
                 print("File exists.")
                 if not self.append:
                     # Overwrite mode: delete the existing file before creating a new one
                     print("Overwrite mode: Deleting existing file.")
-                    delete_response = requests.delete(f"{self.base_url}&op=DELETE&recursive=true", timeout=10)
+                    delete_response = self.session.delete(f"{self.base_url}&op=DELETE&recursive=true", timeout=10)
                     if delete_response.status_code not in [200, 201]:
                         raise RuntimeError(f"Failed to delete existing file: {delete_response.text}")
                     print("File deleted successfully.")
                     # Create a new empty file in HDFS
                     print("Creating new file.")
-                    response = requests.put(f"{self.base_url}&op=CREATE&overwrite=true", timeout=10)
+                    response = self.session.put(f"{self.base_url}&op=CREATE&overwrite=true", timeout=10)
                     if response.status_code not in [200, 201]:
                         raise RuntimeError(f"Failed to create HDFS file: {response.text}")
                     else:
@@ -97,7 +149,7 @@ class HDFSSink(gr.sync_block):
             else:
                 # File does not exist: create it in overwrite mode to ensure it's fresh
                 print("File does not exist. Creating it...")
-                response = requests.put(f"{self.base_url}&op=CREATE&overwrite=true", timeout=10)
+                response = self.session.put(f"{self.base_url}&op=CREATE&overwrite=true", timeout=10)
                 if response.status_code not in [200, 201]:
                     raise RuntimeError(f"Failed to create HDFS file: {response.text}")
                 else:
@@ -106,7 +158,9 @@ class HDFSSink(gr.sync_block):
             raise RuntimeError(f"Error initializing HDFS Sink: {str(e)}")
 
         # Start the background writer thread to handle queued data chunks
-        self.writer_thread.start()
+        self._last_flush_ns = time.monotonic_ns()
+        for thread in self.writer_threads:
+            thread.start()
         print("HDFSSink block successfully started.")
         return super().start()
 
@@ -114,49 +168,180 @@ class HDFSSink(gr.sync_block):
         """Push incoming data into the internal buffer, flushing to the queue when threshold is reached."""
         in0 = input_items[0]
 
-        with self.lock:
-            self.internal_buffer.extend(in0.tobytes())
+        if __debug__:
+            assert not self._stopped, "HDFSSink.work() called after stop()"
+            self._in_work = True
+
+        # in0 is only valid until work() returns, so it has to be copied once; a numpy slice
+        # assignment into the pooled chunk is that single copy, and the writer then sends the
+        # chunk as one contiguous body without gathering pieces
+        n_in = len(in0)
+        copied = 0
+
+        while copied < n_in:
+            # Copy as many items as fit into the remaining space of the current buffer
+            n = min(n_in - copied, len(self._stage) - self._stage_n)
+            self._stage[self._stage_n:self._stage_n + n] = in0[copied:copied + n]
+            self._stage_n += n
+            copied += n
+
+            # Once the buffer is full, hand it over to the writer
+            if self._stage_n == len(self._stage):
+                self._flush()
 
-        # If the internal buffer has grown to at least buffer_size, enqueue a chunk for writing
-        if len(self.internal_buffer) >= self.buffer_size:
-            self.queue.put(self.internal_buffer[:self.buffer_size])
-            # Retain any leftover bytes in the buffer
-            self.internal_buffer = self.internal_buffer[self.buffer_size:]
+        # Hand over a partially filled buffer once the flush deadline has passed
+        if (self.flush_interval_ns and self._stage_n * self._itemsize >= self.min_flush_bytes
+                and time.monotonic_ns() - self._last_flush_ns >= self.flush_interval_ns):
+            self._flush()
+
+        if __debug__:
+            self._in_work = False
 
         return len(in0)
 
+    def _flush(self):
+        """Enqueue the staged bytes for the writer threads and start filling a fresh buffer."""
+        self.queue.put((self._seq, self.internal_buffer[:self._stage_n * self._itemsize]))
+        self._seq += 1
+        self.internal_buffer = memoryview(self.pool.get())
+        self._stage = np.frombuffer(self.internal_buffer, dtype=self._dtype)
+        self._stage_n = 0
+        self._last_flush_ns = time.monotonic_ns()
+
     def _writer(self):
         """Background thread for writing data chunks to HDFS."""
-        while not self.stop_event.is_set() or not self.queue.empty():
+        while True:
+            # Block until the next data chunk; None is the shutdown sentinel queued by stop()
+            item = self.queue.get()
+            if item is None:
+                break
+            seq, chunk = item
+
             try:
-                # Wait up to 1 second for a data chunk
-                chunk = self.queue.get(timeout=1)
-                response = requests.post(
-                    f"{self.base_url}&op=APPEND",  # Always use APPEND since file handled in start()
-                    headers={"Content-Type": "application/octet-stream"},
-                    data=chunk,
-                    timeout=10
-                )
+                body = compress(chunk, self.compression)
+                if self.num_writers == 1 or seq == 0:
+                    # Always use APPEND since file handled in start(); with part files the first chunk
+                    # still goes to the target, so it is never empty when the parts are spliced on
+                    response = self._append(body)
+                else:
+                    response = self._upload("PUT", f"{self._part_url(seq)}&op=CREATE&overwrite=true", body)
+                    if response.status_code in [200, 201]:
+                        with self._parts_lock:
+                            self._parts.add(seq)
                 if response.status_code not in [200, 201]:
                     print(f"Failed to write to HDFS: {response.text}")
-            except queue.Empty:
-                continue  # No data to write right now; loop again
             except requests.exceptions.RequestException as e:
                 print(f"Error writing to HDFS: {str(e)}")
+            except Exception as e:
+                # Anything else (e.g. a compression error or MemoryError) only loses this chunk; the
+                # writer must keep draining, or work() and stop() would block on the bounded queue
+                print(f"Error preparing data for HDFS: {e!r}")
+            finally:
+                # Hand the buffer back so work() can refill it
+                self.pool.put(chunk.obj)
+
+    def _append(self, chunk):
+        """APPEND one chunk to the target file, reusing the DataNode URL of the previous APPEND when possible."""
+        if self._append_dn_url is not None:
+            try:
+                response = self._send("POST", self._append_dn_url, chunk, allow_redirects=False)
+            except requests.exceptions.RequestException:
+                # Not retried (the DataNode may have taken part of the chunk), but ask the NameNode next time
+                self._append_dn_url = None
+                raise
+            if response.status_code not in [403, 404, 410]:
+                return response
+            # The DataNode no longer accepts appends at this URL (e.g. the lease expired): go via the NameNode
+            self._append_dn_url = None
+
+        url = f"{self.base_url}&op=APPEND"
+        target, response = self._redirect("POST", url)
+        if target is None:
+            return response
+        response = self._send("POST", target, chunk)
+        if target != url and response.status_code in [200, 201]:
+            self._append_dn_url = target
+        return response
+
+    def _upload(self, method, url, chunk):
+        """CREATE/APPEND one chunk: get the DataNode redirect from the NameNode without a body, then upload there."""
+        target, response = self._redirect(method, url)
+        if target is None:
+            return response
+        return self._send(method, target, chunk)
+
+    def _redirect(self, method, url):
+        """
+        Ask the NameNode where to send a CREATE/APPEND body, without sending it.
+        Returns (target, None) with the redirect Location, or url itself if the NameNode accepted the
+        request without redirecting; returns (None, response) on an error reply so no body is sent.
+        """
+        response = self.session.request(method, url, allow_redirects=False, timeout=10)
+        if response.is_redirect:
+            return response.headers["Location"], None
+        if 200 <= response.status_code < 300:
+            return url, None
+        return None, response
+
+    def _send(self, method, url, chunk, **kwargs):
+        """Upload one chunk as the request body."""
+        return self.session.request(
+            method,
+            url,
+            headers={"Content-Type": "application/octet-stream"},
+            data=chunk,  # memoryview: sent straight from the pooled buffer
+            timeout=10,
+            **kwargs
+        )
+
+    def _part_path(self, seq):
+        """HDFS path of the part file holding chunk seq (same folder as the target, as CONCAT requires)."""
+        return f"{self.hdfs_file_path}.part{seq:08d}"
+
+    def _part_url(self, seq):
+        """Base URL for WebHDFS operations on the part file holding chunk seq."""
+        return f"http://{self.webhdfs_addr}/webhdfs/v1{self._part_path(seq)}?user.name={self.user}"
+
+    def _concat_parts(self):
+        """Splice the written part files, in sequence order, onto the end of the target file."""
+        parts = [self._part_path(seq) for seq in sorted(self._parts)]
+        for i in range(0, len(parts), _CONCAT_BATCH):
+            sources = ",".join(parts[i:i + _CONCAT_BATCH])
+            try:
+                response = self.session.post(f"{self.base_url}&op=CONCAT&sources={sources}", timeout=60)
+                if response.status_code != 200:
+                    print(f"Failed to concatenate part files: {response.text}")
+                    return
+            except requests.exceptions.RequestException as e:
+                print(f"Error concatenating part files: {str(e)}")
+                return
+        self._parts.clear()
 
     def stop(self):
         """Flush remaining data, signal the writer thread to finish, and clean up."""
         print("Stopping HDFSSink block...")
 
+        if __debug__:
+            assert not self._in_work, "HDFSSink.stop() called while work() is running"
+            self._stopped = True
+
         # Flush any remaining data in the internal buffer to the queue
-        with self.lock:
-            if self.internal_buffer:
-                self.queue.put(self.internal_buffer)
-                self.internal_buffer = bytearray()
-
-        # Signal the writer thread to exit and wait for it to finish
-        self.stop_event.set()
-        self.writer_thread.join()
+        # (work is no longer scheduled at this point, so no locking is required)
+        if self._stage_n:
+            self.queue.put((self._seq, self.internal_buffer[:self._stage_n * self._itemsize]))
+            self._seq += 1
+            self._stage_n = 0
+
+        # Signal the writer threads to exit once the queue is drained and wait for them to finish
+        for _ in self.writer_threads:
+            self.queue.put(None)
+        for thread in self.writer_threads:
+            thread.join()
+
+        # With parallel writers, assemble the final file from its parts
+        if self._parts:
+            self._concat_parts()
+        self.session.close()
         print("HDFSSink block stopped successfully.")
         return super().stop()
 
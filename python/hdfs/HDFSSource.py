@@ -13,6 +13,29 @@ import requests
 import threading
 import queue
 import os
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pycurl
+except ImportError:
+    pycurl = None
+
+from .buffers import ChunkPool, ChunkQueue
+from .webhdfs import make_session
+from .compression import StreamDecompressor, check_compression
+
+# Bytes received before a partially downloaded chunk is handed to work()
+_PUBLISH_SIZE = 1 << 20
+
+# Map input types to numpy dtypes
+_INPUT_TYPES = {
+    "complex": np.complex64,
+    "float": np.float32,
+    "int": np.int32,
+    "short": np.int16,
+    "byte": np.int8
+}
 
 class HDFSSource(gr.sync_block):
     """
@@ -20,7 +43,8 @@ class HDFSSource(gr.sync_block):
     Mimics GNU Radio's File Source block but retrieves data from HDFS instead of a local file system.
     """
 
-    def __init__(self, filename, folder, webhdfs_addr, user="hadoop", input_type="complex", chunk_size=134217728):
+    def __init__(self, filename, folder, webhdfs_addr, user="hadoop", input_type="complex", chunk_size=134217728, num_readers=4,
+                 backend="requests", compression="none"):
         """
         Args:
             filename (str): Name of the file to read from HDFS.
@@ -29,19 +53,13 @@ class HDFSSource(gr.sync_block):
             user (str): HDFS username to use for API requests.
             input_type (str): Output data type (e.g., "complex").
             chunk_size (int): Number of bytes to read from HDFS per request (default is 128 MB).
+            num_readers (int): Number of OPEN requests kept in flight concurrently (default is 4).
+            backend (str): HTTP client used for reads, either "requests" or "pycurl" (requires pycurl).
+            compression (str): "none", "zstd" or "gzip"; must match the HDFS Sink that wrote the file.
         """
 
-        # Map input types to numpy dtypes
-        input_type_dict = {
-            "complex": np.complex64,
-            "float": np.float32,
-            "int": np.int32,
-            "short": np.int16,
-            "byte": np.int8
-        }
-
         # Define out_sig based on the selected input_type
-        out_sig = [input_type_dict[input_type]]
+        out_sig = [_INPUT_TYPES[input_type]]
 
         # Call the parent constructor with no input signal and the determined output type
         super(HDFSSource, self).__init__(
@@ -61,19 +79,48 @@ class HDFSSource(gr.sync_block):
         # Base URL for WebHDFS operations on this file (uses user.name for authentication)
         self.base_url = f"http://{self.webhdfs_addr}/webhdfs/v1{self.hdfs_file_path}?user.name={self.user}"
 
-        # Size (in bytes) to request per OPEN operation; stored data is enqueued for output
-        self.chunk_size = chunk_size
-        self.data_queue = queue.Queue()
+        self.num_readers = max(1, num_readers)
+
+        if backend == "pycurl" and pycurl is None:
+            raise RuntimeError("The pycurl backend was selected but pycurl is not installed")
+        self.backend = backend
+        self._curl = threading.local()  # One reusable pycurl handle per download thread
+
+        check_compression(compression)
+        self.compression = compression
+        self._decompressor = None
+        self._carry = b""  # Decompressed bytes short of a whole item
+
+        # Persistent HTTP session: keeps NameNode and DataNode connections alive between requests
+        self.session = make_session(pool_maxsize=max(4, self.num_readers))
+
+        # Size (in bytes) to request per OPEN operation, rounded down to whole items so that
+        # every chunk (and every slice of it handed to work) holds complete samples
+        self._dtype = out_sig[0]
+        self._itemsize = np.dtype(self._dtype).itemsize
+        if chunk_size < self._itemsize:
+            raise ValueError(f"chunk_size must be at least one {input_type} item ({self._itemsize} bytes), got {chunk_size}")
+        self.chunk_size =chunk_size - chunk_size % self._itemsize
+        self.pool = ChunkPool(self.chunk_size, max_chunks=self.num_readers + 1)
+        # One slot per chunk downloading or waiting for work(), released once work() drains it,
+        # so a slow downstream block caps the read-ahead at as many chunks as the pool keeps
+        self._readahead = threading.Semaphore(self.num_readers + 1)
+        # Queue of (view, last) pairs: views into pooled buffers, last marks the final view of a buffer
+        self.data_queue = ChunkQueue()
+        # Partially consumed view, the byte offset of its first unread item, and its last flag
+        self._leftover = None
+        self._leftover_off = 0
+        self._leftover_last = False
         self.stop_event = threading.Event()
+        self._abort_event = threading.Event()  # Cancels in-flight downloads once reading is over
         self.reader_thread = threading.Thread(target=self._reader)
-        self.lock = threading.Lock()
 
     def start(self):
         """Prepare for reading data from HDFS: verify that the file exists before starting the reader."""
         print("Starting HDFSSource block...")
         try:
             # Check whether the specified file exists in HDFS
-            response = requests.get(f"{self.base_url}&op=GETFILESTATUS", timeout=10)
+            response = self.session.get(f"{self.base_url}&op=GETFILESTATUS", timeout=10)
 
             if response.status_code != 200:
                 raise RuntimeError(f"HDFS file not found: {response.text}")
@@ -91,62 +138,211 @@ class HDFSSource(gr.sync_block):
         items_written = 0
 
         while items_written < len(out0):
-            try:
-                # Block up to 1 second waiting for the next data chunk
-                chunk = self.data_queue.get(timeout=1)
-
-                # Calculate how many bytes to copy into the output buffer
-                bytes_to_copy = min(len(chunk), (len(out0) - items_written) * out0.itemsize)
-                np_chunk = np.frombuffer(chunk[:bytes_to_copy], dtype=out0.dtype)
-                out0[items_written:items_written + len(np_chunk)] = np_chunk
-                items_written += len(np_chunk)
+            if self._leftover is None:
+                try:
+                    # Block up to 1 second waiting for the next data chunk
+                    self._leftover, self._leftover_last = self.data_queue.get(timeout=1)
+                    self._leftover_off = 0
+                except queue.Empty:
+                    # No data available in the queue right now; break to return whatever was written
+                    break
 
-                # If there is leftover data beyond what fits in out0, put it back into the queue
-                if bytes_to_copy < len(chunk):
-                    self.data_queue.put(chunk[bytes_to_copy:])
+            # Copy as many whole items as fit straight from the pooled buffer into the output buffer
+            need = len(out0) - items_written
+            avail = (len(self._leftover) - self._leftover_off) // self._itemsize
+            n = min(need, avail)
+            src = np.frombuffer(self._leftover, dtype=self._dtype, count=n, offset=self._leftover_off)
+            np.copyto(out0[items_written:items_written + n], src)
+            items_written += n
+            self._leftover_off += n * self._itemsize
 
-            except queue.Empty:
-                # No data available in the queue right now; break to return whatever was written
-                break
+            # Drop the view once it is drained (recycling its buffer and freeing its read-ahead
+            # slot after the final one); otherwise keep it for the next call
+            if n == avail:
+                if self._leftover_last:
+                    self.pool.put(self._leftover.obj)
+                    self._readahead.release()
+                self._leftover = None
 
         return items_written
 
     def _reader(self):
-        """Background thread that fetches data chunks from HDFS using OPEN operations."""
+        """Background thread that fetches data chunks from HDFS, keeping several OPEN requests in flight."""
         offset = 0
+        pending = collections.deque()  # (future, channel) per chunk, in file order
 
-        while not self.stop_event.is_set():
-            try:
-                response = requests.get(
-                    f"{self.base_url}&op=OPEN&offset={offset}&length={self.chunk_size}",
-                    timeout=10
-                )
-
-                if response.status_code == 200:
-                    data = response.content
-
-                    if data:
-                        # Enqueue the received bytes and update the read offset
-                        self.data_queue.put(data)
-                        offset += len(data)
-                    else:
-                        # No more data: end of file reached
-                        print("End of HDFS file reached.")
+        fetch = self._fetch_pycurl if self.backend == "pycurl" else self._fetch
+        if self.compression != "none":
+            self._decompressor = StreamDecompressor(self.compression)
+
+        with ThreadPoolExecutor(max_workers=self.num_readers) as executor:
+            while not self.stop_event.is_set():
+                # Keep up to num_readers byte ranges downloading ahead of the one being forwarded;
+                # wait for work() to free a slot only when there is nothing else to forward
+                while len(pending) < self.num_readers:
+                    if pending:
+                        if not self._readahead.acquire(blocking=False):
+                            break
+                    elif not self._readahead.acquire(timeout=1):
                         break
-                else:
+                    channel = ChunkQueue()
+                    pending.append((executor.submit(fetch, offset, channel), channel))
+                    offset += self.chunk_size
+
+                if not pending:
+                    # Still waiting for work(); check stop_event again
+                    continue
+
+                future, channel = pending.popleft()
+
+                try:
+                    self._forward(channel)
+                    filled = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Error reading from HDFS: {str(e)}")
+                    break
+                except RuntimeError as e:
                     # Failed to read from HDFS; log and exit
-                    print(f"Failed to read from HDFS: {response.text}")
+                    print(str(e))
                     break
 
-            except requests.exceptions.RequestException as e:
-                print(f"Error reading from HDFS: {str(e)}")
-                break
+                if filled < self.chunk_size and not self.stop_event.is_set():
+                    # Short read: end of file reached
+                    print("End of HDFS file reached.")
+                    break
+
+            # Ranges requested past the end of the file are simply discarded
+            self._abort_event.set()
+
+    def _forward(self, channel):
+        """Pass the views of one chunk on to work() as they arrive, decompressing them if needed."""
+        while True:
+            view, last = channel.get()
+
+            if self._decompressor is not None:
+                # Hand work() the whole decompressed items; the compressed buffer can be recycled right away
+                data = self._carry + self._decompressor.decompress(view)
+                ready = len(data) - len(data) % self._itemsize
+                if ready:
+                    self.data_queue.put((memoryview(data)[:ready], False))
+                self._carry = data[ready:]
+                if last:
+                    self.pool.put(view.obj)
+                    # Empty marker that releases the chunk's read-ahead slot once work() gets to it
+                    self.data_queue.put((memoryview(b""), True))
+            elif len(view) or last:
+                # The final view goes through even when empty: work() recycles the buffer
+                # only after draining it, i.e. once every earlier view of the buffer is read
+                self.data_queue.put((view, last))
+
+            if last:
+                return
+
+    def _fetch(self, offset, channel):
+        """Download one chunk into a pooled buffer, publishing (view, last) pairs to channel as data arrives."""
+        buf = self.pool.get()
+        view = memoryview(buf)
+        filled = 0      # Bytes of this chunk received so far
+        published = 0   # Bytes of this chunk already handed on
+
+        try:
+            # Stream the body straight into the pooled buffer instead of materializing response.content
+            with self.session.get(
+                f"{self.base_url}&op=OPEN&offset={offset}&length={self.chunk_size}",
+                stream=True,
+                timeout=10
+            ) as response:
+
+                if response.status_code != 200:
+                    raise RuntimeError(f"Failed to read from HDFS: {response.text}")
+
+                for block in response.iter_content(chunk_size=_PUBLISH_SIZE):
+                    if self._abort_event.is_set():
+                        break
+                    view[filled:filled + len(block)] = block
+                    filled += len(block)
+
+                    # Let work() start on the whole items received so far
+                    ready = filled - filled % self._itemsize
+                    if ready - published >= _PUBLISH_SIZE:
+                        channel.put((view[published:ready], False))
+                        published = ready
+        finally:
+            # Always close the chunk so the coordinator never waits on a failed download
+            channel.put((view[published:filled], True))
+
+        return filled
+
+    def _fetch_pycurl(self, offset, channel):
+        """Same as _fetch, but libcurl writes the body into the pooled buffer through a callback."""
+        curl = getattr(self._curl, "handle", None)
+        if curl is None:
+            # The handle keeps its connections (and the DataNode redirect target) alive between chunks
+            curl = self._curl.handle = pycurl.Curl()
+            curl.setopt(pycurl.FOLLOWLOCATION, 1)
+            curl.setopt(pycurl.NOSIGNAL, 1)
+            curl.setopt(pycurl.TCP_KEEPALIVE, 1)
+            curl.setopt(pycurl.BUFFERSIZE, 512 * 1024)
+            curl.setopt(pycurl.CONNECTTIMEOUT, 10)
+            # Mirror the requests read timeout: give up when nothing arrives for 10 seconds
+            curl.setopt(pycurl.LOW_SPEED_LIMIT, 1)
+            curl.setopt(pycurl.LOW_SPEED_TIME, 10)
+
+        buf = self.pool.get()
+        view = memoryview(buf)
+        filled = 0      # Bytes of this chunk received so far
+        published = 0   # Bytes of this chunk already handed on
+        status = None   # Status of the latest response; the final one wins after the 307 redirect
+        error = bytearray()
+
+        def header(line):
+            # getinfo() cannot be called while perform() runs, so track the status lines here
+            nonlocal status
+            if line.startswith(b"HTTP/"):
+                status = int(line.split()[1])
+
+        def write(data):
+            nonlocal filled, published
+            if self._abort_event.is_set():
+                return 0  # Returning a short count aborts the transfer
+            if status != 200:
+                error.extend(data)
+                return None
+            view[filled:filled + len(data)] = data
+            filled += len(data)
+
+            # Let work() start on the whole items received so far
+            ready = filled - filled % self._itemsize
+            if ready - published >= _PUBLISH_SIZE:
+                channel.put((view[published:ready], False))
+                published = ready
+            return None
+
+        try:
+            curl.setopt(pycurl.URL, f"{self.base_url}&op=OPEN&offset={offset}&length={self.chunk_size}")
+            curl.setopt(pycurl.HEADERFUNCTION, header)
+            curl.setopt(pycurl.WRITEFUNCTION, write)
+            try:
+                curl.perform()
+            except pycurl.error as e:
+                if not self._abort_event.is_set():
+                    raise RuntimeError(f"Error reading from HDFS: {str(e)}")
+
+            if status != 200 and not self._abort_event.is_set():
+                raise RuntimeError(f"Failed to read from HDFS: {error.decode(errors='replace')}")
+        finally:
+            # Always close the chunk so the coordinator never waits on a failed download
+            channel.put((view[published:filled], True))
+
+        return filled
 
     def stop(self):
         """Signal the reader thread to stop and wait for it to finish before exiting."""
         print("Stopping HDFSSource block...")
         self.stop_event.set()
+        self._abort_event.set()
         self.reader_thread.join()
+        self.session.close()
         print("HDFSSource block stopped successfully.")
         return super().stop()
 
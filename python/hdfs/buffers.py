@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 MXL.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+
+import collections
+import queue
+import threading
+
+class ChunkPool:
+    """
+    Small free list of equally sized bytearrays.
+    Lets the HDFS blocks reuse their large transfer buffers instead of allocating
+    (and page-faulting) a new one for every chunk.
+    """
+
+    def __init__(self, chunk_size, max_chunks=4):
+        """
+        Args:
+            chunk_size (int): Size of each pooled buffer in bytes.
+            max_chunks (int): Maximum number of idle buffers kept for reuse.
+        """
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self._free = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return an idle buffer from the pool, or allocate a new one if none is available."""
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return bytearray(self.chunk_size)
+
+    def put(self, buf):
+        """Return a buffer to the pool; it is dropped if the pool is full or the size does not match."""
+        if len(buf) != self.chunk_size:
+            return
+        with self._lock:
+            if len(self._free) < self.max_chunks:
+                self._free.append(buf)
+
+
+class ChunkQueue:
+    """
+    Lightweight FIFO for handing chunks between a block and its worker thread.
+    Relies on the atomic append/popleft of collections.deque and only touches an
+    Event when the queue runs empty or full, instead of taking a lock on every call.
+    Meant for a single producer; consumers re-check after clearing an event, so a
+    wakeup is never lost.
+    """
+
+    def __init__(self, maxsize=0):
+        """
+        Args:
+            maxsize (int): Maximum number of queued items before put() blocks (0 means unbounded).
+        """
+        self.maxsize = maxsize
+        self._items = collections.deque()
+        self._not_empty = threading.Event()
+        self._not_full = threading.Event()
+        self._not_full.set()
+
+    def put(self, item):
+        """Append an item, blocking while the queue is full."""
+        while self.maxsize and len(self._items) >= self.maxsize:
+            self._not_full.clear()
+            if len(self._items) < self.maxsize:
+                break
+            self._not_full.wait()
+        self._items.append(item)
+        if not self._not_empty.is_set():
+            self._not_empty.set()
+
+    def get(self, timeout=None):
+        """Pop the oldest item, raising queue.Empty if none arrives within timeout seconds."""
+        while True:
+            try:
+                item = self._items.popleft()
+            except IndexError:
+                self._not_empty.clear()
+                if self._items:
+                    continue
+                if not self._not_empty.wait(timeout):
+                    raise queue.Empty
+                continue
+            if not self._not_full.is_set():
+                self._not_full.set()
+            return item
+
+    def empty(self):
+        """Return True if no items are queued."""
+        return not self._items
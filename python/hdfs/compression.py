@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 MXL.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+
+import gzip
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Supported values for the blocks' compression argument
+COMPRESSIONS = ("none", "zstd", "gzip")
+
+def check_compression(compression):
+    """Raise if the compression setting is unknown or its library is missing."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {', '.join(COMPRESSIONS)}")
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("zstd compression was selected but the zstandard package is not installed")
+
+def compress(data, compression):
+    """
+    Compress one chunk as a self-contained zstd frame or gzip member.
+    Level 1 is used throughout: close to memcpy speed while still shrinking low-entropy samples.
+    """
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=1, threads=-1).compress(data)
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=1)
+    return data
+
+class StreamDecompressor:
+    """
+    Incremental decompressor for a file made of concatenated zstd frames or gzip members,
+    as written by the sink one chunk at a time. Accepts the data in arbitrary pieces.
+    """
+
+    def __init__(self, compression):
+        if compression == "zstd":
+            self._factory = lambda: zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self._factory = lambda: zlib.decompressobj(wbits=31)
+        self._obj = self._factory()
+
+    def decompress(self, data):
+        """Return all output available from data, continuing into following frames/members."""
+        out = []
+        try:
+            while data:
+                out.append(self._obj.decompress(data))
+                if not self._obj.eof:
+                    break
+                # End of one frame/member: the rest of the input starts the next one
+                data = self._obj.unused_data
+                self._obj = self._factory()
+        except Exception as e:
+            # zlib.error / zstandard.ZstdError: the data is corrupt or not in the expected format
+            raise RuntimeError(f"Failed to decompress HDFS data: {str(e)}")
+        return b"".join(out)
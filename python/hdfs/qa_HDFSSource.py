@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 MXL.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+import numpy as np
+from gnuradio import gr, gr_unittest
+
+try:
+    from gnuradio.hdfs import HDFSSource
+    from gnuradio.hdfs.buffers import ChunkQueue
+    from gnuradio.hdfs.HDFSSource import _PUBLISH_SIZE
+except ImportError:
+    import os
+    import sys
+    dirname, filename = os.path.split(os.path.abspath(__file__))
+    sys.path.append(os.path.join(dirname, "bindings"))
+    from gnuradio.hdfs import HDFSSource
+    from gnuradio.hdfs.buffers import ChunkQueue
+    from gnuradio.hdfs.HDFSSource import _PUBLISH_SIZE
+
+
+class qa_HDFSSource(gr_unittest.TestCase):
+
+    def setUp(self):
+        # Never started, so no request reaches the (unused) WebHDFS address
+        self.src = HDFSSource("data.bin", "/tmp", "localhost:1", input_type="int",
+                              chunk_size=2 * _PUBLISH_SIZE, num_readers=2)
+
+    def tearDown(self):
+        self.src.session.close()
+        self.src = None
+
+    def _replay(self, data):
+        """Publish one downloaded chunk the way _fetch does and forward it towards work()."""
+        buf = self.src.pool.get()
+        view = memoryview(buf)
+        view[:len(data)] = data
+        channel = ChunkQueue()
+        published = 0
+        while len(data) - published >= _PUBLISH_SIZE:
+            channel.put((view[published:published + _PUBLISH_SIZE], False))
+            published += _PUBLISH_SIZE
+        # Empty when the chunk ends on a publish boundary
+        channel.put((view[published:len(data)], True))
+        self.src._forward(channel)
+
+    def _drain(self):
+        """Call work() until every forwarded view has been consumed."""
+        out = []
+        while self.src._leftover is not None or not self.src.data_queue.empty():
+            out0 = np.zeros(100000, dtype=np.int32)
+            n = self.src.work([], [out0])
+            out.append(out0[:n])
+        return np.concatenate(out)
+
+    def test_001_chunks_forwarded_before_work(self):
+        # Three full chunks and a short one, all forwarded before work() reads anything
+        expected = np.arange(7 * _PUBLISH_SIZE // 4 + 1000, dtype=np.int32)
+        data = memoryview(expected.tobytes())
+        for offset in range(0, len(data), self.src.chunk_size):
+            self._replay(data[offset:offset + self.src.chunk_size])
+
+        np.testing.assert_array_equal(self._drain(), expected)
+
+    def test_002_chunks_interleaved_with_work(self):
+        # Four full chunks, each drained before the next one reuses its buffer
+        expected = np.arange(self.src.chunk_size, dtype=np.int32)
+        data = memoryview(expected.tobytes())
+        out = []
+        for offset in range(0, len(data), self.src.chunk_size):
+            self._replay(data[offset:offset + self.src.chunk_size])
+            out.append(self._drain())
+
+        np.testing.assert_array_equal(np.concatenate(out), expected)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_HDFSSource)
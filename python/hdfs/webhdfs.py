@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 MXL.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+
+
+import socket
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# Kernel send/receive buffer per socket, large enough to keep a WAN link's bandwidth-delay product in flight
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+
+class BulkTransferAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose sockets are tuned for bulk WebHDFS transfers:
+    enlarged SO_SNDBUF/SO_RCVBUF and TCP keepalive on top of urllib3's defaults.
+    """
+
+    socket_options = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE),
+        (socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        return super().init_poolmanager(*args, **kwargs)
+
+def make_session(pool_maxsize=4):
+    """
+    Create a persistent HTTP session that keeps NameNode and DataNode connections alive between requests.
+
+    Args:
+        pool_maxsize (int): Number of connections kept open per host.
+    """
+    session = requests.Session()
+    session.mount("http://", BulkTransferAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0))
+    session.headers.update({"Connection": "keep-alive"})
+    return session